@@ -3,13 +3,21 @@ Streamlit Health Chatbot Application
 A user-friendly web interface for the RAG-based health information assistant.
 """
 
+import os
+
+# Single-query FAISS searches run fastest serially; set before FAISS/BLAS are imported
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+import asyncio
+import json
+import shutil
+import time
+import uuid
+
 import streamlit as st
-from src.embedding import huggingface_embeddings
-from src.prompt import medical_information_prompt
-from src.vectorstore import load_vectorstore
-from src.chain import create_rag_chain
 from dotenv import load_dotenv
-import os
 
 # Load environment variables
 load_dotenv()
@@ -22,112 +30,173 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Chat history is archived to disk in blocks of this many messages once session state
+# holds more than twice as many, so it keeps between 1x and 2x RECENT_CHAT_MESSAGES
+RECENT_CHAT_MESSAGES = 20
+
+# Archived chat chunks, one directory per session, deleted when the chat is cleared.
+# Abandoned sessions are pruned after a day, and at most MAX_ARCHIVED_SESSIONS are kept.
+CHAT_ARCHIVE_DIR = "chat_history"
+CHAT_ARCHIVE_TTL_SECONDS = 24 * 60 * 60
+MAX_ARCHIVED_SESSIONS = 1000
+
 # Initialize theme in session state
 if "theme" not in st.session_state:
     st.session_state.theme = "light"
 
 
+# Static HTML / code snippets, built once at import
+HEADER_HTML = """
+<div class="chat-header">
+    <h1>🏥 Health Information Chatbot</h1>
+    <p>Get evidence-based medical information instantly</p>
+</div>
+"""
+
+DISCLAIMER_HTML = """
+<div class="warning-box">
+    <h3>⚠️ Medical Disclaimer</h3>
+    <p><strong>This chatbot provides educational information only.</strong></p>
+    <ul>
+        <li>Not a substitute for professional medical advice</li>
+        <li>Always consult healthcare providers</li>
+        <li>For emergencies, call your local emergency number</li>
+    </ul>
+</div>
+"""
+
+SAMPLE_INDEX_SCRIPT = """# sample_create_index.py
+from src.embedding import huggingface_embeddings
+from src.vectorstore import create_vectorstore
+from langchain_community.document_loaders import TextLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+# 1. Load your documents
+loader = TextLoader("your_medical_data.txt")
+documents = loader.load()
+
+# 2. Split documents into chunks
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200
+)
+chunks = text_splitter.split_documents(documents)
+
+# 3. Create embeddings and vectorstore
+#    (builds an HNSW index, or IVF-PQ for >100k chunks)
+embeddings = huggingface_embeddings()
+vectorstore = create_vectorstore(chunks, embeddings)
+
+print("✅ FAISS index created successfully!")
+"""
+
+
+# Theme stylesheets, built once at import rather than on every rerun
+DARK_THEME_CSS = """
+    <style>
+    /* Dark Mode Styles */
+    .main {
+        background-color: #1a1a1a;
+        color: #e0e0e0;
+    }
+    .stChatMessage {
+        background-color: #2d2d2d;
+        border-radius: 10px;
+        padding: 10px;
+        margin: 5px 0;
+        color: #e0e0e0;
+    }
+    .chat-header {
+        text-align: center;
+        padding: 20px;
+        background: linear-gradient(135deg, #434343 0%, #2d2d2d 100%);
+        color: #e0e0e0;
+        border-radius: 10px;
+        margin-bottom: 20px;
+    }
+    .warning-box {
+        background-color: #3d3d1a;
+        border-left: 5px solid #ffc107;
+        padding: 15px;
+        border-radius: 5px;
+        margin: 10px 0;
+        color: #e0e0e0;
+    }
+    .stMarkdown, .stText, p, li, h1, h2, h3, h4, h5, h6 {
+        color: #e0e0e0 !important;
+    }
+    [data-testid="stSidebar"] {
+        background-color: #2d2d2d;
+    }
+    .theme-toggle {
+        background-color: #434343;
+        border: 2px solid #667eea;
+        color: #e0e0e0;
+        padding: 8px 16px;
+        border-radius: 8px;
+        cursor: pointer;
+        font-size: 14px;
+        margin-bottom: 20px;
+        width: 100%;
+        text-align: center;
+    }
+    </style>
+"""
+
+LIGHT_THEME_CSS = """
+    <style>
+    /* Light Mode Styles */
+    .main {
+        background-color: #f5f7fa;
+        color: #1a1a1a;
+    }
+    .stChatMessage {
+        background-color: white;
+        border-radius: 10px;
+        padding: 10px;
+        margin: 5px 0;
+        color: #1a1a1a;
+    }
+    .chat-header {
+        text-align: center;
+        padding: 20px;
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        border-radius: 10px;
+        margin-bottom: 20px;
+    }
+    .warning-box {
+        background-color: #fff3cd;
+        border-left: 5px solid #ffc107;
+        padding: 15px;
+        border-radius: 5px;
+        margin: 10px 0;
+        color: #1a1a1a;
+    }
+    [data-testid="stSidebar"] {
+        background-color: #ffffff;
+    }
+    .theme-toggle {
+        background-color: #667eea;
+        border: 2px solid #764ba2;
+        color: white;
+        padding: 8px 16px;
+        border-radius: 8px;
+        cursor: pointer;
+        font-size: 14px;
+        margin-bottom: 20px;
+        width: 100%;
+        text-align: center;
+    }
+    </style>
+"""
+
+THEME_CSS = {"dark": DARK_THEME_CSS, "light": LIGHT_THEME_CSS}
+
+
 def apply_theme_css(theme):
     """Apply custom CSS based on the selected theme."""
-    if theme == "dark":
-        st.markdown("""
-            <style>
-            /* Dark Mode Styles */
-            .main {
-                background-color: #1a1a1a;
-                color: #e0e0e0;
-            }
-            .stChatMessage {
-                background-color: #2d2d2d;
-                border-radius: 10px;
-                padding: 10px;
-                margin: 5px 0;
-                color: #e0e0e0;
-            }
-            .chat-header {
-                text-align: center;
-                padding: 20px;
-                background: linear-gradient(135deg, #434343 0%, #2d2d2d 100%);
-                color: #e0e0e0;
-                border-radius: 10px;
-                margin-bottom: 20px;
-            }
-            .warning-box {
-                background-color: #3d3d1a;
-                border-left: 5px solid #ffc107;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 10px 0;
-                color: #e0e0e0;
-            }
-            .stMarkdown, .stText, p, li, h1, h2, h3, h4, h5, h6 {
-                color: #e0e0e0 !important;
-            }
-            [data-testid="stSidebar"] {
-                background-color: #2d2d2d;
-            }
-            .theme-toggle {
-                background-color: #434343;
-                border: 2px solid #667eea;
-                color: #e0e0e0;
-                padding: 8px 16px;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 14px;
-                margin-bottom: 20px;
-                width: 100%;
-                text-align: center;
-            }
-            </style>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown("""
-            <style>
-            /* Light Mode Styles */
-            .main {
-                background-color: #f5f7fa;
-                color: #1a1a1a;
-            }
-            .stChatMessage {
-                background-color: white;
-                border-radius: 10px;
-                padding: 10px;
-                margin: 5px 0;
-                color: #1a1a1a;
-            }
-            .chat-header {
-                text-align: center;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                border-radius: 10px;
-                margin-bottom: 20px;
-            }
-            .warning-box {
-                background-color: #fff3cd;
-                border-left: 5px solid #ffc107;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 10px 0;
-                color: #1a1a1a;
-            }
-            [data-testid="stSidebar"] {
-                background-color: #ffffff;
-            }
-            .theme-toggle {
-                background-color: #667eea;
-                border: 2px solid #764ba2;
-                color: white;
-                padding: 8px 16px;
-                border-radius: 8px;
-                cursor: pointer;
-                font-size: 14px;
-                margin-bottom: 20px;
-                width: 100%;
-                text-align: center;
-            }
-            </style>
-        """, unsafe_allow_html=True)
+    st.markdown(THEME_CSS.get(theme, LIGHT_THEME_CSS), unsafe_allow_html=True)
 
 
 # Apply the current theme
@@ -135,8 +204,63 @@ apply_theme_css(st.session_state.theme)
 
 
 @st.cache_resource
+def _get_embeddings():
+    """Load and cache the embedding model (the heaviest resource)."""
+    from src.embedding import huggingface_embeddings
+
+    return huggingface_embeddings()
+
+
+def _warm_up(embeddings, vectorstore):
+    """Run a throwaway query so the first real user message doesn't pay the cold-start cost."""
+    try:
+        embeddings.embed_query("warmup")
+        vectorstore.similarity_search("warmup", k=1)
+    except Exception as e:
+        print(f"⚠️ Warm-up query failed (continuing): {e}")
+
+
+@st.cache_resource
+def _get_vectorstore(_embeddings, vectorstore_path="faiss_index"):
+    """Load, warm up and cache the FAISS vectorstore. The leading underscore skips hashing the embeddings."""
+    from src.vectorstore import load_vectorstore
+
+    vectorstore = load_vectorstore(
+        embeddings=_embeddings,
+        vectorstore_path=vectorstore_path,
+        ivf_parallel_mode=2
+    )
+    if vectorstore is not None:
+        _warm_up(_embeddings, vectorstore)
+    return vectorstore
+
+
+@st.cache_data(max_entries=512, ttl=3600, show_spinner=False)
+def _embed_query(query, _embeddings):
+    """Embed a user query, caching the vector so repeated questions skip the model."""
+    return _embeddings.embed_query(query)
+
+
+@st.cache_resource
+def _get_chain(_vectorstore):
+    """Build and cache the RAG chain on top of the cached vectorstore."""
+    from src.chain import create_rag_chain
+    from src.prompt import medical_information_prompt
+
+    embeddings = _vectorstore.embeddings
+    return create_rag_chain(
+        vectorstore=_vectorstore,
+        prompt=medical_information_prompt(),
+        query_embedder=lambda query: _embed_query(query, embeddings)
+    )
+
+
 def initialize_chatbot():
-    """Initialize and cache the RAG chain to avoid reloading on every interaction."""
+    """
+    Compose the separately cached embeddings, vectorstore and RAG chain.
+    The ML stack (torch, FAISS, LangChain) is only imported from here, so the
+    page renders before any of it is loaded.
+    """
     try:
         with st.spinner("🔄 Loading embeddings and vectorstore..."):
             vectorstore_path = "faiss_index"
@@ -145,20 +269,17 @@ def initialize_chatbot():
             if not os.path.exists(os.path.join(vectorstore_path, "index.faiss")):
                 return None, "FAISS index not found. Please create the vectorstore first."
 
-            embeddings = huggingface_embeddings()
+            embeddings = _get_embeddings()
 
             try:
-                vectorstore = load_vectorstore(
-                    embeddings=embeddings,
-                    vectorstore_path=vectorstore_path
-                )
+                vectorstore = _get_vectorstore(embeddings, vectorstore_path)
             except Exception as load_error:
                 error_msg = str(load_error)
                 if "not recognized" in error_msg or "struct faiss" in error_msg:
                     return None, "CORRUPTED_INDEX"
                 raise load_error
 
-            chain = create_rag_chain(vectorstore=vectorstore, prompt=medical_information_prompt())
+            chain = _get_chain(vectorstore)
         return chain, None
     except Exception as e:
         return None, str(e)
@@ -166,28 +287,13 @@ def initialize_chatbot():
 
 def display_header():
     """Display the app header."""
-    st.markdown("""
-        <div class="chat-header">
-            <h1>🏥 Health Information Chatbot</h1>
-            <p>Get evidence-based medical information instantly</p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
 
 def display_disclaimer():
     """Display medical disclaimer."""
     with st.sidebar:
-        st.markdown("""
-            <div class="warning-box">
-                <h3>⚠️ Medical Disclaimer</h3>
-                <p><strong>This chatbot provides educational information only.</strong></p>
-                <ul>
-                    <li>Not a substitute for professional medical advice</li>
-                    <li>Always consult healthcare providers</li>
-                    <li>For emergencies, call your local emergency number</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+        st.markdown(DISCLAIMER_HTML, unsafe_allow_html=True)
 
 
 def display_theme_toggle():
@@ -235,10 +341,189 @@ def display_sidebar_info():
 
         # Clear chat button
         if st.button("🗑️ Clear Chat History", use_container_width=True):
-            st.session_state.messages = []
+            reset_chat_history()
             st.rerun()
 
 
+def _archive_dir(session_id):
+    """Directory holding a chat session's archived chunks (one JSON file per chunk)."""
+    return os.path.join(CHAT_ARCHIVE_DIR, session_id)
+
+
+def prune_chat_archive():
+    """
+    Delete session archives older than CHAT_ARCHIVE_TTL_SECONDS, then keep at most
+    MAX_ARCHIVED_SESSIONS of the most recently written ones.
+    """
+    try:
+        entries = [entry for entry in os.scandir(CHAT_ARCHIVE_DIR) if entry.is_dir()]
+    except FileNotFoundError:
+        return
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    cutoff = time.time() - CHAT_ARCHIVE_TTL_SECONDS
+
+    for position, entry in enumerate(entries):
+        if position >= MAX_ARCHIVED_SESSIONS or entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+@st.cache_resource
+def _prune_chat_archive_at_startup():
+    """Prune archives left by abandoned sessions once per process."""
+    prune_chat_archive()
+
+
+def load_archived_chunks(session_id, first_chunk, last_chunk):
+    """
+    Return the archived chunks first_chunk..last_chunk-1 of a session, oldest first.
+    Chunks that are missing on disk (e.g. pruned) are skipped.
+    """
+    chunks = []
+    for chunk_index in range(first_chunk, last_chunk):
+        path = os.path.join(_archive_dir(session_id), f"{chunk_index:06d}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                chunks.append(json.load(f))
+        except FileNotFoundError:
+            continue
+    return chunks
+
+
+def save_archived_chunk(session_id, chunk_index, messages):
+    """Write one archived chunk as its own file (atomically), then prune old archives."""
+    session_dir = _archive_dir(session_id)
+    os.makedirs(session_dir, exist_ok=True)
+
+    path = os.path.join(session_dir, f"{chunk_index:06d}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(messages, f)
+    os.replace(tmp_path, path)
+
+    prune_chat_archive()
+
+
+def delete_archived_chunks(session_id):
+    """Remove a session's archive from disk."""
+    shutil.rmtree(_archive_dir(session_id), ignore_errors=True)
+
+
+def init_chat_history():
+    """Start a new archive session id with no archived chunks; messages already in session state are kept."""
+    st.session_state.setdefault("messages", [])
+    st.session_state.session_id = uuid.uuid4().hex
+    st.session_state.archived_chunks = 0
+    st.session_state.shown_archived_chunks = 0
+
+
+def reset_chat_history():
+    """Clear the chat, including its archive on disk, and start a new session id."""
+    if "session_id" in st.session_state:
+        delete_archived_chunks(st.session_state.session_id)
+    st.session_state.messages = []
+    init_chat_history()
+
+
+def archive_old_messages():
+    """
+    Once the history exceeds 2 x RECENT_CHAT_MESSAGES, move the oldest block of
+    RECENT_CHAT_MESSAGES messages into a new archive chunk on disk.
+    """
+    while len(st.session_state.messages) > 2 * RECENT_CHAT_MESSAGES:
+        block = st.session_state.messages[:RECENT_CHAT_MESSAGES]
+        save_archived_chunk(
+            st.session_state.session_id, st.session_state.archived_chunks, block)
+
+        st.session_state.archived_chunks += 1
+        del st.session_state.messages[:RECENT_CHAT_MESSAGES]
+
+
+async def stream_answer(chain, prompt, placeholder):
+    """Consume the chain's LLM token events and render the growing answer into `placeholder`."""
+    answer = ""
+    async for event in chain.astream_events({"input": prompt}, version="v2"):
+        if event["event"] != "on_chat_model_stream":
+            continue
+        token = event["data"]["chunk"].content
+        if token:
+            answer += token
+            placeholder.markdown(answer)
+    return answer
+
+
+@st.fragment
+def chat_area(chain):
+    """
+    Chat history, input and response.
+    Runs as a fragment, so sending a message reruns only the chat, not the whole page.
+    """
+
+    # Older messages live in the disk-backed archive and are only shown on request
+    if st.session_state.shown_archived_chunks < st.session_state.archived_chunks:
+        if st.button("⬆️ Load older messages", use_container_width=True):
+            st.session_state.shown_archived_chunks += 1
+
+    older_messages = []
+    if st.session_state.shown_archived_chunks:
+        first_chunk = st.session_state.archived_chunks - st.session_state.shown_archived_chunks
+        chunks = load_archived_chunks(
+            st.session_state.session_id, first_chunk, st.session_state.archived_chunks)
+        if len(chunks) < st.session_state.shown_archived_chunks:
+            st.warning("⚠️ Some older messages are no longer available in the archive.")
+        for chunk in chunks:
+            older_messages.extend(chunk)
+
+    # Display chat messages from history
+    for message in older_messages + st.session_state.messages:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+    # Chat input
+    if prompt := st.chat_input("Ask your health question here..."):
+
+        # Validate input
+        if not prompt.strip():
+            st.warning("⚠️ Please enter a valid question.")
+            return
+
+        # Add user message to chat history
+        st.session_state.messages.append({"role": "user", "content": prompt})
+
+        # Display user message
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        # Generate response
+        with st.chat_message("assistant"):
+            with st.spinner("🔍 Searching medical information..."):
+                try:
+                    # Stream the answer token-by-token into a placeholder
+                    placeholder = st.empty()
+                    answer = asyncio.run(stream_answer(chain, prompt, placeholder))
+
+                    if not answer:
+                        answer = "I couldn't generate a response."
+                        placeholder.markdown(answer)
+
+                    # Add assistant response to chat history
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": answer
+                    })
+
+                except Exception as e:
+                    error_message = f"❌ Error generating response: {str(e)}"
+                    st.error(error_message)
+                    st.session_state.messages.append({
+                        "role": "assistant",
+                        "content": error_message
+                    })
+
+        # Keep session state bounded
+        archive_old_messages()
+
+
 def main():
     """Main application function."""
 
@@ -279,30 +564,7 @@ def main():
             """)
 
             with st.expander("🔧 Quick Fix: Sample Index Creation Script"):
-                st.code("""
-# sample_create_index.py
-from src.embedding import huggingface_embeddings
-from src.vectorstore import create_vectorstore
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-# 1. Load your documents
-loader = TextLoader("your_medical_data.txt")
-documents = loader.load()
-
-# 2. Split documents into chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200
-)
-chunks = text_splitter.split_documents(documents)
-
-# 3. Create embeddings and vectorstore
-embeddings = huggingface_embeddings()
-vectorstore = create_vectorstore(chunks, embeddings)
-
-print("✅ FAISS index created successfully!")
-                """, language="python")
+                st.code(SAMPLE_INDEX_SCRIPT, language="python")
             st.stop()
         else:
             st.error(f"❌ Error initializing chatbot: {error}")
@@ -312,54 +574,15 @@ print("✅ FAISS index created successfully!")
 
     if chain is None:
         st.error("❌ Failed to initialize chatbot. Please check your configuration.")
-        st.stop()    # Initialize chat history in session state
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.stop()
 
-    # Display chat messages from history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
+    # Initialize chat history in session state
+    if "session_id" not in st.session_state:
+        init_chat_history()
 
-    # Chat input
-    if prompt := st.chat_input("Ask your health question here..."):
+    _prune_chat_archive_at_startup()
 
-        # Validate input
-        if not prompt.strip():
-            st.warning("⚠️ Please enter a valid question.")
-            return
-
-        # Add user message to chat history
-        st.session_state.messages.append({"role": "user", "content": prompt})
-
-        # Display user message
-        with st.chat_message("user"):
-            st.markdown(prompt)
-
-        # Generate response
-        with st.chat_message("assistant"):
-            with st.spinner("🔍 Searching medical information..."):
-                try:
-                    response = chain.invoke({"input": prompt})
-                    answer = response.get(
-                        "answer", "I couldn't generate a response.")
-
-                    # Display the answer
-                    st.markdown(answer)
-
-                    # Add assistant response to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": answer
-                    })
-
-                except Exception as e:
-                    error_message = f"❌ Error generating response: {str(e)}"
-                    st.error(error_message)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_message
-                    })
+    chat_area(chain)
 
 
 if __name__ == "__main__":
@@ -1,25 +1,123 @@
-from src.prompt import medical_information_prompt
-from src.embedding import huggingface_embeddings
-from src.vectorstore import load_vectorstore
-from src.chain import create_rag_chain
+import argparse
+import asyncio
+import os
+import sys
+
 from dotenv import load_dotenv
 load_dotenv()
 
-embeddings = huggingface_embeddings("BAAI/bge-small-en-v1.5")
+# NOTE: the src.* modules (torch, FAISS, LangChain) are imported inside the functions
+# below, so the thread settings in main() are applied before they are loaded.
+
+# Max number of LLM requests in flight at once in batch mode
+MAX_CONCURRENT_LLM_CALLS = 8
+
+
+async def answer_all(document_chain, queries, docs_per_query):
+    """Answer every query concurrently from its pre-retrieved documents."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_LLM_CALLS)
+
+    async def answer(query, docs):
+        async with semaphore:
+            return await document_chain.ainvoke({"input": query, "context": docs})
+
+    return await asyncio.gather(
+        *(answer(q, docs) for q, docs in zip(queries, docs_per_query)),
+        return_exceptions=True
+    )
+
+
+def run_batch(embeddings, vectorstore, prompt):
+    """Read queries from stdin, embed and retrieve them in one batch, then answer concurrently."""
+    from src.chain import create_retriever, create_document_chain
+
+    queries = [line.strip() for line in sys.stdin.read().splitlines() if line.strip()]
+    if not queries:
+        return
+
+    # One embedding call and one FAISS search for the whole batch
+    vectors = embeddings.embed_documents(queries)
+    docs_per_query = create_retriever(vectorstore).search_batch(vectors)
+
+    answers = asyncio.run(
+        answer_all(create_document_chain(prompt), queries, docs_per_query))
+
+    for query, answer in zip(queries, answers):
+        print(f"\nQuery: {query}")
+        print("\nHealth Chatbot:")
+        if isinstance(answer, Exception):
+            print(f"❌ Error generating response: {answer}")
+        else:
+            print(answer)
+        print("=" * 60)
+
+
+def run_interactive(vectorstore, prompt):
+    """Interactive REPL, one query at a time."""
+    from src.chain import create_rag_chain
+
+    chain = create_rag_chain(vectorstore=vectorstore, prompt=prompt)
+
+    while True:
+        query = input("\nEnter your query: ")
+
+        response = chain.invoke({"input": query})
+
+        print("\nHealth Chatbot:")
+        print(response["answer"])
+        print("=" * 60)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Health Information Chatbot (CLI)")
+    parser.add_argument("--model", default="BAAI/bge-small-en-v1.5",
+                        help="HuggingFace embedding model name")
+    parser.add_argument("--onnx-int8", action="store_true",
+                        help="Embed queries with an int8-quantized ONNX export of --model")
+    parser.add_argument("--index-path", default="faiss_index",
+                        help="Path to the FAISS index folder")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", action="store_true",
+                      help="Answer all queries read from stdin (default when stdin is not a TTY)")
+    mode.add_argument("--interactive", action="store_true",
+                      help="Interactive prompt (default when stdin is a TTY)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    batch = args.batch or (not args.interactive and not sys.stdin.isatty())
+
+    if batch:
+        # Batch output can be large; don't flush on every line
+        sys.stdout.reconfigure(line_buffering=False)
+    else:
+        # Single-query searches run fastest serially; must be set before torch/FAISS/BLAS load.
+        # Batch mode keeps all threads for embedding and searching the whole batch.
+        os.environ.setdefault("OMP_NUM_THREADS", "1")
+        os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
+        os.environ.setdefault("MKL_NUM_THREADS", "1")
+
+    from src.prompt import medical_information_prompt
+    from src.embedding import huggingface_embeddings, onnx_int8_embeddings
+    from src.vectorstore import load_vectorstore
 
-vectorstore = load_vectorstore(
-    embeddings=embeddings,
-    vectorstore_path="faiss_index")
+    if args.onnx_int8:
+        embeddings = onnx_int8_embeddings(args.model)
+    else:
+        embeddings = huggingface_embeddings(args.model)
 
-prompt = medical_information_prompt()
+    vectorstore = load_vectorstore(
+        embeddings=embeddings,
+        vectorstore_path=args.index_path)
 
-chain = create_rag_chain(vectorstore=vectorstore, prompt=prompt)
+    prompt = medical_information_prompt()
 
-while True:
-    query = input("\nEnter your query: ")
+    if batch:
+        run_batch(embeddings, vectorstore, prompt)
+    else:
+        run_interactive(vectorstore, prompt)
 
-    response = chain.invoke({"input": query})
 
-    print("\nHealth Chatbot:")
-    print(response["answer"])
-    print("=" * 60)
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,43 @@ Simple and modern RAG chain setup using LangChain Classic (Groq + FAISS).
 from langchain_groq import ChatGroq
 from langchain_classic.chains import create_retrieval_chain
 from langchain_classic.chains.combine_documents import create_stuff_documents_chain
+from src.retriever import BatchingRetriever
+import os
 
+# Groq's fast tier by default; override with the GROQ_MODEL environment variable
+DEFAULT_GROQ_MODEL = "llama-3.1-8b-instant"
 
-def create_rag_chain(vectorstore, prompt):
+
+def create_retriever(vectorstore, query_embedder=None):
+    """
+    Create the retriever used by the RAG chain.
+    Concurrent queries are batched into one FAISS search.
+    `query_embedder` optionally replaces the vectorstore's query embedding (e.g. with a cached one).
+    """
+    return BatchingRetriever(
+        vectorstore=vectorstore,
+        search_type="mmr",
+        k=7,
+        time_window_ms=50,
+        query_embedder=query_embedder,
+    )
+
+
+def create_document_chain(prompt):
+    """
+    Create the LLM + prompt chain that answers from already retrieved documents.
+    Expects {"input": ..., "context": [Document, ...]} as input.
+    """
+    llm = ChatGroq(
+        model=os.getenv("GROQ_MODEL", DEFAULT_GROQ_MODEL),
+        temperature=0.2,
+        streaming=True,
+    )
+
+    return create_stuff_documents_chain(llm, prompt)
+
+
+def create_rag_chain(vectorstore, prompt, query_embedder=None):
     """
     Create and return a complete RAG chain.
     This function:
@@ -18,25 +52,14 @@ def create_rag_chain(vectorstore, prompt):
 
     print("\n🚀 Initializing RAG chain...")
 
-    # 1️⃣ Create retriever
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",
-        search_kwargs={"k": 7}
-    )
-
-    # 2️⃣ Initialize LLM (Groq)
-    llm = ChatGroq(
-        model="openai/gpt-oss-120b",
-        temperature=0.2,
-    )
-
-    # 3️⃣ Define prompt template
+    # 1️⃣ Create retriever (batches concurrent queries into one FAISS search)
+    retriever = create_retriever(vectorstore, query_embedder=query_embedder)
 
+    # 2️⃣ Initialize LLM (Groq) with the prompt template
     # PROMPT FOR MEDICAL INFORMATION / HEALTH CHATBOT
-    prompt = prompt
+    document_chain = create_document_chain(prompt)
 
-    # 4️⃣ Build RAG chain
-    document_chain = create_stuff_documents_chain(llm, prompt)
+    # 3️⃣ Build RAG chain
     rag_chain = create_retrieval_chain(retriever, document_chain)
 
     print("✅✅ RAG chain created successfully!\n" + "=" * 60)
@@ -2,7 +2,10 @@
 generating embeddings for the chunked documents for RAG system
 '''
 
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
+import numpy as np
+import os
 import torch
 
 
@@ -36,3 +39,70 @@ def huggingface_embeddings(model_name="BAAI/bge-small-en-v1.5"):
 
     return embeddings
 
+
+# 2. ONNX Runtime int8 Embeddings (CPU)
+class ONNXEmbeddings(Embeddings):
+    '''LangChain Embeddings backed by an ONNX Runtime feature-extraction model (CLS pooling, as used by BGE)'''
+
+    def __init__(self, model, tokenizer, batch_size=32, normalize_embeddings=True):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+
+    def _embed(self, texts):
+        inputs = self.tokenizer(
+            texts, padding=True, truncation=True, return_tensors="np")
+        outputs = self.model(**inputs)
+        vectors = np.asarray(outputs.last_hidden_state)[:, 0]
+
+        if self.normalize_embeddings:
+            vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        return vectors.tolist()
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[i:i + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed([text])[0]
+
+
+def onnx_int8_embeddings(model_name="BAAI/bge-small-en-v1.5", save_dir="onnx_models"):
+    '''Embeddings from an int8 dynamically quantized ONNX export of the model (needs `optimum[onnxruntime]`)'''
+
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    print("\n[INFO] ONNX int8 Embedding model Initializing...")
+
+    model_dir = os.path.join(save_dir, model_name.replace("/", "__"))
+    quantized_file = "model_quantized.onnx"
+
+    # Export + quantize once, then reuse the saved model
+    if not os.path.exists(os.path.join(model_dir, quantized_file)):
+        print(f"[INFO] Exporting and quantizing {model_name} to {model_dir}")
+
+        model = ORTModelForFeatureExtraction.from_pretrained(
+            model_name, export=True, provider="CPUExecutionProvider")
+        quantizer = ORTQuantizer.from_pretrained(model)
+        quantizer.quantize(
+            save_dir=model_dir,
+            quantization_config=AutoQuantizationConfig.avx512_vnni(
+                is_static=False, per_channel=False)
+        )
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+    model = ORTModelForFeatureExtraction.from_pretrained(
+        model_dir, file_name=quantized_file, provider="CPUExecutionProvider")
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    print("[INFO] Model loaded successfully on CPU (ONNX int8)")
+
+    print("=" * 50)
+
+    return ONNXEmbeddings(model, tokenizer)
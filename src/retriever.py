@@ -0,0 +1,238 @@
+'''
+retriever.py, contains a FAISS retriever that micro-batches concurrent queries into a single index search
+'''
+
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, Field, PrivateAttr
+
+
+def physical_core_count():
+    """
+    Number of physical CPU cores (OpenMP oversubscribes on SMT siblings).
+    Uses psutil if available, then /proc/cpuinfo, then falls back to the logical count.
+    """
+    try:
+        import psutil
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    except ImportError:
+        pass
+
+    try:
+        cores = set()
+        physical_id = None
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    cores.add((physical_id, value.strip()))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+
+    return os.cpu_count() or 1
+
+
+class BatchingRetriever(BaseRetriever):
+    """
+    Retriever that coalesces concurrent queries into one batched FAISS search.
+    Each caller embeds its own query and blocks on a Future, while a background
+    worker collects the queries already waiting (up to `max_batch_size`, for at most
+    `time_window_ms`) and issues a single `index.search` for the whole batch.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    search_type: str = "mmr"
+    k: int = 7
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    max_batch_size: int = 32
+    time_window_ms: float = 50
+    # OpenMP threads for batches and parallel_mode=2 IVF queries; physical cores by default
+    batch_num_threads: int = Field(default_factory=physical_core_count)
+    query_embedder: Optional[Callable[[str], List[float]]] = None
+
+    _queue: queue.Queue = PrivateAttr(default_factory=queue.Queue)
+    _worker: threading.Thread = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a single query, via `query_embedder` (e.g. a cached one) if provided."""
+        if self.query_embedder is not None:
+            return self.query_embedder(query)
+        return self.vectorstore._embed_query(query)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((self.embed_query(query), future))
+        return future.result()
+
+    # -----------------------------------------------------------------
+
+    def _ensure_worker(self):
+        """
+        Start the background batching thread on first use.
+        The worker only holds a weak reference to the retriever, and a finalizer sends it
+        a shutdown sentinel, so a discarded retriever (and its vectorstore) can be freed.
+        """
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=_batching_worker,
+                    args=(weakref.ref(self), self._queue),
+                    name="faiss-batching-retriever",
+                    daemon=True,
+                )
+                self._worker.start()
+                weakref.finalize(self, self._queue.put, _SHUTDOWN)
+
+    def _collect_more(self, batch):
+        """
+        Add to `batch` whatever else is already queued.
+        A lone query is dispatched immediately; only while other queries are still
+        arriving does the batch keep waiting (up to `time_window_ms`) for more.
+        """
+        deadline = time.monotonic() + self.time_window_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+
+            # Nobody else is waiting, don't delay this query
+            if len(batch) == 1:
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+    def search_batch(self, vectors) -> List[List[Document]]:
+        """
+        Run one FAISS search for a batch of query vectors and map the results back to documents.
+        """
+        xq = np.asarray(vectors, dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            faiss.normalize_L2(xq)
+
+        index = self.vectorstore.index
+
+        # One OpenMP thread for a lone query avoids threading overhead; real batches get
+        # `batch_num_threads` OpenMP threads. This only covers FAISS's own OpenMP loops: the
+        # BLAS (sgemm) part of large batched searches follows MKL_NUM_THREADS/OMP_NUM_THREADS,
+        # which app.py pins to 1 at startup, so it stays single-threaded in the Streamlit app.
+        # IVF indices in parallel_mode=2 split a single query across inverted lists, so
+        # they keep all threads even for one query.
+        single_query_parallel = getattr(index, "parallel_mode", 0) == 2
+        if len(xq) == 1 and not single_query_parallel:
+            faiss.omp_set_num_threads(1)
+        else:
+            faiss.omp_set_num_threads(self.batch_num_threads)
+        n_results = self.fetch_k if self.search_type == "mmr" else self.k
+        _, indices = index.search(xq, n_results)
+
+        results = []
+        for query_vector, row in zip(xq, indices):
+            ids = [int(i) for i in row if i != -1]
+
+            if self.search_type == "mmr" and ids:
+                candidates = np.array([index.reconstruct(i) for i in ids])
+                selected = maximal_marginal_relevance(
+                    query_vector,
+                    candidates,
+                    k=min(self.k, len(ids)),
+                    lambda_mult=self.lambda_mult,
+                )
+                ids = [ids[i] for i in selected]
+
+            results.append([self._lookup(i) for i in ids[: self.k]])
+
+        return results
+
+    def _lookup(self, i) -> Document:
+        """Resolve a FAISS row id to its stored Document."""
+        docstore_id = self.vectorstore.index_to_docstore_id[i]
+        return self.vectorstore.docstore.search(docstore_id)
+
+
+# Queued by the retriever's finalizer to stop its worker thread
+_SHUTDOWN = object()
+
+
+def _batching_worker(retriever_ref, work_queue):
+    """
+    Background loop of a BatchingRetriever. Holds the retriever strongly only while a
+    batch is being served, and fails every pending Future if anything goes wrong, so
+    callers never block forever.
+    """
+    while True:
+        item = work_queue.get()
+        if item is _SHUTDOWN:
+            return
+
+        batch = [item]
+        stop = False
+        retriever = retriever_ref()
+        try:
+            if retriever is None:
+                raise RuntimeError("BatchingRetriever was discarded")
+
+            retriever._collect_more(batch)
+            stop = any(entry is _SHUTDOWN for entry in batch)
+            batch = [entry for entry in batch if entry is not _SHUTDOWN]
+
+            results = retriever.search_batch([vector for vector, _ in batch])
+            for (_, future), docs in zip(batch, results):
+                future.set_result(docs)
+        except Exception as e:
+            stop = stop or any(entry is _SHUTDOWN for entry in batch)
+            _fail_pending(batch, e)
+        finally:
+            retriever = None
+
+        # Never leave a caller waiting on a Future nobody will resolve
+        _fail_pending(batch, RuntimeError("No retrieval result for query"))
+
+        if stop:
+            return
+
+
+def _fail_pending(batch, error):
+    """Set `error` on every unresolved Future in `batch`."""
+    for entry in batch:
+        if entry is not _SHUTDOWN and not entry[1].done():
+            entry[1].set_exception(error)
+
+
+# =====================================================================
+# END OF FILE
@@ -3,23 +3,105 @@ vectorstore.py, contains functions to create vectorstore, load vectorstore and a
 '''
 
 # VECTORSTORE RELATED IMPORTS
+import os
+import pickle
+
+import faiss
+import numpy as np
+import torch
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
 
+# ANN INDEX SETTINGS
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 64
+
+IVF_PQ_THRESHOLD = 100_000  # switch from HNSW to IVF-PQ above this many chunks
+IVF_PQ_FACTORY = "IVF1024,PQ32"
+IVF_NPROBE = 8
+
+# GPU resources must outlive any index moved onto the GPU
+_GPU_RESOURCES = None
+
+
+def move_index_to_gpu(index, needs_reconstruct=True):
+    """
+    Move a FAISS index to GPU 0 if CUDA and a GPU build of FAISS are available.
+    Returns the original index unchanged otherwise (e.g. faiss-cpu, or index types
+    such as HNSW that have no GPU implementation).
+    If `needs_reconstruct` is set (MMR retrieval reconstructs candidate vectors), IVF
+    indices stay on CPU: their GPU copies drop the direct map and can't `reconstruct`.
+    """
+    global _GPU_RESOURCES
+
+    if not torch.cuda.is_available() or not hasattr(faiss, "StandardGpuResources"):
+        return index
+
+    if needs_reconstruct and faiss.try_extract_index_ivf(index) is not None:
+        print("\n[INFO] Keeping IVF index on CPU (MMR needs reconstruct)")
+        return index
+
+    try:
+        if _GPU_RESOURCES is None:
+            _GPU_RESOURCES = faiss.StandardGpuResources()
+        gpu_index = faiss.index_cpu_to_gpu(_GPU_RESOURCES, 0, index)
+        print("\n[INFO] FAISS index moved to GPU")
+        return gpu_index
+    except Exception as e:
+        print(f"\n[INFO] Keeping FAISS index on CPU: {e}")
+        return index
+
+
+def build_faiss_index(vectors):
+    """
+    Build an approximate-nearest-neighbour FAISS index for the given vectors.
+    - HNSW (flat storage) for normal corpus sizes
+    - IVF-PQ for very large corpora (trained on the vectors, compressed storage)
+    The vectors are NOT added; that is left to the LangChain wrapper.
+    """
+    d = vectors.shape[1]
+
+    if len(vectors) > IVF_PQ_THRESHOLD:
+        index = faiss.index_factory(d, IVF_PQ_FACTORY)
+        print(f"\n[INFO] Training {IVF_PQ_FACTORY} index on {len(vectors)} vectors...")
+        index.train(vectors)
+        index.nprobe = IVF_NPROBE
+        # Needed for `reconstruct`, which MMR search relies on
+        faiss.extract_index_ivf(index).make_direct_map()
+    else:
+        index = faiss.IndexHNSWFlat(d, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+
+    return index
+
+
 # 1. creating a new vectorstore from scratch
 
 def create_vectorstore(documents, embeddings):
     """
     Create a new FAISS vectorstore from documents and embeddings.
+    Uses an HNSW index (IVF-PQ for very large corpora) instead of a brute-force flat index.
     """
     try:
-        vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=embeddings,
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=build_faiss_index(vectors),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
             distance_strategy='COSINE'  # Better for normalized embeddings
         )
+        vectorstore.add_embeddings(zip(texts, vectors.tolist()), metadatas=metadatas)
 
-        print(f"\n[INFO] Vector dimension: {vectorstore.index.d}")
+        print(f"\n[INFO] Index type: {type(vectorstore.index).__name__}")
+
+        print(f"[INFO] Vector dimension: {vectorstore.index.d}")
 
         print(
             f"[INFO] Total Vectors in the store: <{vectorstore.index.ntotal}>")
@@ -39,17 +121,53 @@ def create_vectorstore(documents, embeddings):
 
 # 2. loading an existing vectorstore from disk
 
-def load_vectorstore(embeddings, vectorstore_path="faiss_index"):
+def load_vectorstore(embeddings, vectorstore_path="faiss_index", ivf_parallel_mode=None, use_gpu=True, mmap=True,
+                     needs_reconstruct=True):
     """
     Load an existing FAISS vectorstore.
+    If `mmap` is set, the index is read with IO_FLAG_MMAP. This only affects IVF indices,
+    whose inverted lists are memory-mapped read-only (loaded on demand, shared between
+    processes); flat and HNSW indices are still read fully into RAM.
+    If `ivf_parallel_mode` is given and the index is an IVF index, it is applied as the
+    index's `parallel_mode` (2 = parallelize over inverted lists within a single query).
+    Flat indices are left untouched.
+    If `use_gpu` is set and CUDA is available, the index is moved to the GPU
+    (IVF indices stay on CPU while `needs_reconstruct` is set, as MMR search requires).
     """
 
     try:
-        vectorstore = FAISS.load_local(
-            vectorstore_path,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True
-        )
+        if mmap:
+            # Same files as FAISS.load_local; IVF inverted lists are mmap'ed, other index types load normally
+            index = faiss.read_index(
+                os.path.join(vectorstore_path, "index.faiss"),
+                faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+            with open(os.path.join(vectorstore_path, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+
+            vectorstore = FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=docstore,
+                index_to_docstore_id=index_to_docstore_id
+            )
+        else:
+            vectorstore = FAISS.load_local(
+                vectorstore_path,
+                embeddings=embeddings,
+                allow_dangerous_deserialization=True
+            )
+
+        # Only IVF indices have `parallel_mode`; single-query search benefits from parallelizing
+        # over lists. Thread count is set per search by the retriever, not here.
+        if ivf_parallel_mode is not None and hasattr(vectorstore.index, "parallel_mode"):
+            vectorstore.index.parallel_mode = ivf_parallel_mode
+            print(f"\n[INFO] IVF index detected, parallel_mode={ivf_parallel_mode}")
+
+        # GPU and CPU indices share the same interface, so LangChain works with either
+        if use_gpu:
+            vectorstore.index = move_index_to_gpu(
+                vectorstore.index, needs_reconstruct=needs_reconstruct)
 
         print(f"\n[INFO] Vector dimension: {vectorstore.index.d}")
 